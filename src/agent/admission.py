@@ -0,0 +1,192 @@
+"""Admission control for chat model calls.
+
+Every provider request sent by the model router, hedged requests included,
+goes through a single in-process controller. The number of concurrent requests
+adapts with AIMD (additive increase on success,
+multiplicative decrease on provider rate limiting), and callers waiting for a
+slot are served by priority so checkout turns are not stuck behind browsing.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+from langchain_core.messages import AIMessage
+
+from agent import cart
+from agent.state import State
+
+# Lower values are admitted first.
+PRIORITY_APPROVAL = 0
+PRIORITY_CART = 1
+PRIORITY_BROWSING = 2
+
+
+def session_priority(state: State) -> int:
+    """Return the admission priority of the session's next model call."""
+    # A purchase is awaiting approval only until the model's next message.
+    last_ai = next(
+        (m for m in reversed(state.messages) if isinstance(m, AIMessage)), None
+    )
+    if last_ai is not None and any(
+        tc["name"] == "purchase_burger_items" for tc in last_ai.tool_calls
+    ):
+        return PRIORITY_APPROVAL
+    if cart.load_purchase_information(state.purchase_information).items:
+        return PRIORITY_CART
+    return PRIORITY_BROWSING
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Return whether the error signals that the provider is rate limiting us."""
+    return (
+        getattr(error, "status_code", None) == 429
+        or "RateLimit" in type(error).__name__
+    )
+
+
+@dataclass
+class QueueMetrics:
+    """Queue-time metrics of the admission controller."""
+
+    window: int = 1000
+    admitted: int = 0
+    rate_limited: int = 0
+    max_wait: float = 0.0
+    waits: deque[float] = field(init=False)
+
+    def __post_init__(self) -> None:
+        """Create the bounded queue-time window."""
+        self.waits = deque(maxlen=self.window)
+
+    def record_wait(self, wait: float) -> None:
+        """Record how long a call waited for admission."""
+        self.admitted += 1
+        self.max_wait = max(self.max_wait, wait)
+        self.waits.append(wait)
+
+    def percentile(self, q: float) -> float:
+        """Return the ``q`` queue-time percentile (0-1) of the recent window."""
+        if not self.waits:
+            return 0.0
+        ordered = sorted(self.waits)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AdmissionController:
+    """AIMD concurrency limiter with a priority wait queue.
+
+    Args:
+        initial_limit: Concurrency limit to start with.
+        min_limit: Lower bound of the concurrency limit.
+        max_limit: Upper bound of the concurrency limit.
+        backoff: Factor applied to the limit when the provider rate limits us.
+        cooldown: Seconds after a decrease during which further rate limit
+            errors do not shrink the limit again, so one burst of 429s from
+            calls already in flight counts as a single congestion event.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        cooldown: float = 1.0,
+    ) -> None:
+        """Initialize the admission controller."""
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.metrics = QueueMetrics()
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._counter = itertools.count()
+        self._last_decrease = -float("inf")
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of calls waiting for admission."""
+        return sum(1 for *_, fut in self._waiters if not fut.done())
+
+    def stats(self) -> dict[str, Any]:
+        """Return a snapshot of the limiter state and queue-time metrics."""
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "admitted": self.metrics.admitted,
+            "rate_limited": self.metrics.rate_limited,
+            "wait_p50": self.metrics.percentile(0.5),
+            "wait_p95": self.metrics.percentile(0.95),
+            "wait_max": self.metrics.max_wait,
+        }
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def _acquire(self, priority: int) -> None:
+        if self._has_capacity() and not self.queue_depth:
+            self.in_flight += 1
+            return
+
+        fut: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            # The slot may have been handed over right before the cancellation.
+            if fut.done() and not fut.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_capacity():
+            *_, fut = heapq.heappop(self._waiters)
+            if fut.done():
+                continue
+            self.in_flight += 1
+            fut.set_result(None)
+
+    def _on_success(self) -> None:
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    def _on_rate_limited(self) -> None:
+        self.metrics.rate_limited += 1
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+
+    @asynccontextmanager
+    async def admit(self, priority: int = PRIORITY_BROWSING) -> AsyncIterator[None]:
+        """Wait for a slot, then hold it for the duration of the block."""
+        enqueued = time.perf_counter()
+        await self._acquire(priority)
+        self.metrics.record_wait(time.perf_counter() - enqueued)
+        try:
+            yield
+        except Exception as error:
+            if is_rate_limited(error):
+                self._on_rate_limited()
+            raise
+        else:
+            self._on_success()
+        finally:
+            self._release()
@@ -0,0 +1,159 @@
+"""Cart operations and the incremental cart events streamed to clients.
+
+Every change to the cart is emitted through LangGraph's ``custom`` stream mode
+as a small patch instead of the whole cart::
+
+    {
+        "type": "cart_delta",
+        "seq": 3,
+        "op": "add" | "update" | "remove",
+        "index": 0,
+        "item": {...},  # the line after the change, omitted for "remove"
+        "totals": {"total_price": ..., "total_items": ..., "total_quantity": ...},
+    }
+
+``seq`` increases by one per change within a thread, so a client that sees a
+gap should re-fetch the cart with ``get_current_purchase_information``.
+"""
+
+from __future__ import annotations
+
+import ast
+import json
+from typing import Any, Optional, Union
+
+from agent import pricing
+from agent.catalog import CatalogSnapshot
+from agent.state import PurchaseInformation
+
+CART_DELTA = "cart_delta"
+
+
+def load_purchase_information(
+    raw: Union[str, dict[str, Any], PurchaseInformation, None],
+) -> PurchaseInformation:
+    """Rebuild the purchase information stored in the graph state."""
+    if raw is None:
+        return PurchaseInformation()
+    if isinstance(raw, PurchaseInformation):
+        return raw
+    if isinstance(raw, dict):
+        return PurchaseInformation(**raw)
+
+    prev_purchase_information = json.loads(raw)
+    return PurchaseInformation(
+        items=ast.literal_eval(prev_purchase_information["items"]),
+        total_price=float(prev_purchase_information["total_price"]),
+        total_items=int(prev_purchase_information["total_items"]),
+        total_quantity=int(prev_purchase_information["total_quantity"]),
+    )
+
+
+def _same_line(line: dict[str, Any], item: dict[str, Any]) -> bool:
+    return line["id"] == item["id"] and sorted(pricing.line_option_ids(line)) == sorted(
+        pricing.line_option_ids(item)
+    )
+
+
+def _update_totals(purchase_information: PurchaseInformation) -> None:
+    items = purchase_information.items
+    purchase_information.total_items = len(items)
+    purchase_information.total_quantity = sum(item["quantity"] for item in items)
+    purchase_information.total_price = sum(
+        item["price"] * item["quantity"] for item in items
+    )
+
+
+def _delta(
+    op: str, index: int, purchase_information: PurchaseInformation
+) -> dict[str, Any]:
+    delta: dict[str, Any] = {"type": CART_DELTA, "op": op, "index": index}
+    if op != "remove":
+        delta["item"] = dict(purchase_information.items[index])
+    delta["totals"] = {
+        "total_price": purchase_information.total_price,
+        "total_items": purchase_information.total_items,
+        "total_quantity": purchase_information.total_quantity,
+    }
+    return delta
+
+
+def reprice(
+    purchase_information: PurchaseInformation, snapshot: CatalogSnapshot
+) -> list[dict[str, Any]]:
+    """Reprice every line of the cart with the prices of ``snapshot``.
+
+    Returns the cart deltas of the lines whose price changed.
+    """
+    items = purchase_information.items
+    if not items:
+        return []
+
+    unit_prices = pricing.price_table(snapshot).unit_prices_for(items).tolist()
+    changed = []
+    for index, (item, unit_price) in enumerate(zip(items, unit_prices)):
+        if item["price"] != unit_price:
+            item["price"] = unit_price
+            changed.append(index)
+
+    _update_totals(purchase_information)
+    return [_delta("update", index, purchase_information) for index in changed]
+
+
+def add_item(
+    purchase_information: PurchaseInformation, item: dict[str, Any]
+) -> dict[str, Any]:
+    """Add an item to the cart, merging it with an identical line if any.
+
+    Returns the cart delta describing the change.
+    """
+    for index, line in enumerate(purchase_information.items):
+        if _same_line(line, item):
+            line["quantity"] += item["quantity"]
+            op = "update"
+            break
+    else:
+        purchase_information.items.append(dict(item))
+        index = len(purchase_information.items) - 1
+        op = "add"
+
+    _update_totals(purchase_information)
+    return _delta(op, index, purchase_information)
+
+
+def remove_item(
+    purchase_information: PurchaseInformation, item: dict[str, Any]
+) -> Optional[dict[str, Any]]:
+    """Remove ``item["quantity"]`` units of an item from the cart.
+
+    All units are removed if ``item`` has no quantity. Returns the cart delta
+    describing the change, or None if the item is not in the cart.
+
+    Raises:
+        ValueError: If the quantity to remove is less than 1.
+    """
+    quantity = item.get("quantity")
+    if quantity is not None and quantity < 1:
+        raise ValueError("Expected a quantity of at least 1")
+
+    index = next(
+        (
+            i
+            for i, line in enumerate(purchase_information.items)
+            if _same_line(line, item)
+        ),
+        None,
+    )
+    if index is None:
+        return None
+
+    line = purchase_information.items[index]
+    if quantity is not None and quantity < line["quantity"]:
+        line["quantity"] -= quantity
+        op = "update"
+    else:
+        purchase_information.items.pop(index)
+        op = "remove"
+
+    _update_totals(purchase_information)
+    return _delta(op, index, purchase_information)
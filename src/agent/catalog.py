@@ -0,0 +1,187 @@
+"""Versioned menu catalog loaded from data files with hot reload.
+
+The catalog directory holds ``catalog.json`` (menus and options) and
+``burger_sales_data.csv`` (sales features per menu). They are parsed into an
+immutable ``CatalogSnapshot`` whose version is a hash of the file contents.
+Each worker process loads and holds its own snapshot; since the version only
+depends on the files, every worker serving the same files agrees on it. The
+catalog shipped in the package's ``data`` directory is used unless the
+``CATALOG_DIR`` environment variable points to another directory.
+
+``CatalogStore.current()`` checks the files at most once per
+``check_interval`` and swaps in a new snapshot when they change. Replace the
+files atomically (write to a temporary file, then rename) to publish a new
+catalog; a file that fails to parse is logged and the previous snapshot is kept.
+Conversations pin the snapshot version they started a turn with and look it up
+with ``CatalogStore.get()``, so in-flight turns are not affected by a reload.
+"""
+
+from __future__ import annotations
+
+import csv
+import functools
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CATALOG_FILE = "catalog.json"
+SALES_FILE = "burger_sales_data.csv"
+
+
+@dataclass(frozen=True)
+class MenuItem:
+    """Defines the structure of a menu item."""
+
+    id: int
+    name: str
+    price_krw: int
+
+
+@dataclass(frozen=True)
+class MenuOption:
+    """Defines the structure of a menu option."""
+
+    id: int
+    name: str
+    price_krw: int
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Immutable view of the catalog at one version."""
+
+    version: str
+    menus: tuple[MenuItem, ...]
+    options: tuple[MenuOption, ...]
+    sales_features: Mapping[str, Mapping[str, float]]
+    """Sales features (weather, age group, ...) keyed by menu name."""
+
+    @functools.cached_property
+    def menus_by_id(self) -> Mapping[int, MenuItem]:
+        """Return the menus keyed by ID."""
+        return MappingProxyType({menu.id: menu for menu in self.menus})
+
+    @functools.cached_property
+    def options_by_id(self) -> Mapping[int, MenuOption]:
+        """Return the options keyed by ID."""
+        return MappingProxyType({option.id: option for option in self.options})
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _parse_sales_features(data: bytes) -> dict[str, Mapping[str, float]]:
+    reader = csv.reader(io.StringIO(data.decode("utf-8-sig")))
+    header = next(reader, [])
+    features = {}
+    # Columns: number, product name, then one column per feature.
+    for row in reader:
+        if len(row) < 2:
+            continue
+        features[row[1]] = MappingProxyType(
+            {name: float(value) for name, value in zip(header[2:], row[2:])}
+        )
+    return features
+
+
+def load_snapshot(directory: str) -> CatalogSnapshot:
+    """Load a catalog snapshot from the data files in ``directory``."""
+    catalog_data = _read(os.path.join(directory, CATALOG_FILE))
+    sales_data = _read(os.path.join(directory, SALES_FILE))
+
+    catalog = json.loads(catalog_data)
+    version = hashlib.blake2b(catalog_data + b"\0" + sales_data, digest_size=8)
+    return CatalogSnapshot(
+        version=version.hexdigest(),
+        menus=tuple(MenuItem(**menu) for menu in catalog["menus"]),
+        options=tuple(MenuOption(**option) for option in catalog.get("options", [])),
+        sales_features=MappingProxyType(_parse_sales_features(sales_data)),
+    )
+
+
+class CatalogStore:
+    """Hold the current catalog snapshot and reload it when the files change.
+
+    Args:
+        directory: Directory containing the catalog data files.
+        check_interval: Minimum number of seconds between two file checks.
+        keep: Number of snapshots kept for conversations pinned to them.
+    """
+
+    def __init__(
+        self, directory: str, *, check_interval: float = 1.0, keep: int = 8
+    ) -> None:
+        """Initialize the catalog store."""
+        self.directory = directory
+        self.check_interval = check_interval
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._snapshots: OrderedDict[str, CatalogSnapshot] = OrderedDict()
+        self._stamp = self._file_stamp()
+        self._current = self._remember(load_snapshot(directory))
+        self._checked = time.monotonic()
+
+    def _file_stamp(self) -> tuple[tuple[int, int, int], ...]:
+        stamps = []
+        for name in (CATALOG_FILE, SALES_FILE):
+            st = os.stat(os.path.join(self.directory, name))
+            stamps.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        return tuple(stamps)
+
+    def _remember(self, snapshot: CatalogSnapshot) -> CatalogSnapshot:
+        self._snapshots[snapshot.version] = snapshot
+        self._snapshots.move_to_end(snapshot.version)
+        while len(self._snapshots) > self.keep:
+            self._snapshots.popitem(last=False)
+        return snapshot
+
+    def reload(self) -> CatalogSnapshot:
+        """Reload the catalog if its files changed and return the current one."""
+        with self._lock:
+            self._checked = time.monotonic()
+            try:
+                stamp = self._file_stamp()
+                if stamp != self._stamp:
+                    snapshot = load_snapshot(self.directory)
+                    self._stamp = stamp
+                    if snapshot.version != self._current.version:
+                        logger.info("Loaded catalog version %s", snapshot.version)
+                        # Publishing the new snapshot is a single reference swap.
+                        self._current = self._remember(snapshot)
+            except (OSError, ValueError, KeyError, TypeError) as error:
+                logger.warning(
+                    "Failed to reload catalog, keeping %s: %r",
+                    self._current.version,
+                    error,
+                )
+            return self._current
+
+    def current(self) -> CatalogSnapshot:
+        """Return the latest catalog snapshot."""
+        if time.monotonic() - self._checked >= self.check_interval:
+            return self.reload()
+        return self._current
+
+    def get(self, version: Optional[str]) -> CatalogSnapshot:
+        """Return the snapshot ``version``, or the latest one if unknown."""
+        if version is not None:
+            snapshot = self._snapshots.get(version)
+            if snapshot is not None:
+                return snapshot
+        return self.current()
+
+
+catalog = CatalogStore(os.environ.get("CATALOG_DIR", DEFAULT_CATALOG_DIR))
@@ -2,19 +2,25 @@
 
 from __future__ import annotations
 
+import functools
 import os
 from dataclasses import dataclass, field, fields
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 
 from langchain_core.runnables import RunnableConfig
 from typing_extensions import Annotated
 
 from agent import prompts
+from agent.utils import CompiledPrompt
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, frozen=True)
 class Configuration:
-    """The configuration for the agent."""
+    """The configuration for the agent.
+
+    Instances are immutable and shared: every node and tool of a run resolving
+    the same config gets the same instance.
+    """
 
     user_id: str = "default"
     """The ID of the user to remember in the conversation."""
@@ -25,6 +31,33 @@ class Configuration:
             "Should be in the form: provider/model-name."
         },
     )
+    fallback_models: str = field(
+        default="",
+        metadata={
+            "description": "Comma-separated fallback language models, each in the form "
+            "provider/model-name. Used for hedged requests and when the primary model fails."
+        },
+    )
+    routing_policy: Literal["latency", "cost", "priority"] = field(
+        default="latency",
+        metadata={
+            "description": "How to order the model candidates: by observed latency, "
+            "by cost, or in the configured order."
+        },
+    )
+    profile_targets: str = field(
+        default="",
+        metadata={
+            "description": "Comma-separated user IDs or thread IDs whose runs are "
+            "profiled with the sampling profiler."
+        },
+    )
+    profile_dir: str = field(
+        default="profiles",
+        metadata={
+            "description": "Directory where collapsed-stack profiles are written."
+        },
+    )
     system_prompt: str = prompts.SYSTEM_PROMPT
 
     emotion_system_prompt: str = prompts.EMOTION_RESPONSE_SYSTEM_PROMPT
@@ -46,10 +79,55 @@ class Configuration:
         configurable = (
             config["configurable"] if config and "configurable" in config else {}
         )
-        values: dict[str, Any] = {
-            f.name: os.environ.get(f.name.upper(), configurable.get(f.name))
-            for f in fields(cls)
-            if f.init
-        }
+        values = tuple(configurable.get(name) for name in _init_field_names(cls))
+        try:
+            return _resolve(cls, values)
+        except TypeError:
+            # Unhashable configurable values cannot be cached.
+            return _resolve.__wrapped__(cls, values)
+
+    @functools.cached_property
+    def model_candidates(self) -> list[str]:
+        """Return the primary model followed by the fallback models."""
+        fallbacks = [m.strip() for m in self.fallback_models.split(",") if m.strip()]
+        return [self.model, *fallbacks]
+
+    @functools.cached_property
+    def profile_target_set(self) -> frozenset[str]:
+        """Return the user IDs and thread IDs to profile."""
+        return frozenset(
+            t.strip() for t in self.profile_targets.split(",") if t.strip()
+        )
+
+    @functools.cached_property
+    def system_prompt_template(self) -> CompiledPrompt:
+        """Return the system prompt, parsed once for repeated formatting."""
+        return CompiledPrompt(self.system_prompt)
+
+
+@functools.cache
+def _init_field_names(cls: type[Configuration]) -> tuple[str, ...]:
+    return tuple(f.name for f in fields(cls) if f.init)
+
+
+@functools.cache
+def _env_overrides(cls: type[Configuration]) -> dict[str, str]:
+    # Snapshot of the environment overrides, taken once per process.
+    return {
+        name: os.environ[name.upper()]
+        for name in _init_field_names(cls)
+        if name.upper() in os.environ
+    }
+
+
+@functools.lru_cache(maxsize=1024)
+def _resolve(cls: type[Configuration], values: tuple[Any, ...]) -> Configuration:
+    env = _env_overrides(cls)
+    resolved: dict[str, Any] = {
+        name: env.get(name, value)
+        for name, value in zip(_init_field_names(cls), values)
+    }
+    return cls(**{k: v for k, v in resolved.items() if v})
+
 
-        return cls(**{k: v for k, v in values.items() if v})
+_env_overrides(Configuration)
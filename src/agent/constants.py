@@ -1,30 +1,12 @@
 """Constants for agent module."""
 
-burger_menus = [
-    {"id": 1, "name": "더블 1955® 버거", "price_krw": 7900},
-    {"id": 2, "name": "더블 맥스파이시™ 상하이 버거", "price_krw": 8900},
-    {"id": 3, "name": "더블 쿼터파운더® 치즈", "price_krw": 8500},
-    {"id": 4, "name": "맥스파이시™ 상하이 버거", "price_krw": 6900},
-    {"id": 5, "name": "쿼터파운더® 치즈", "price_krw": 6900},
-    {"id": 6, "name": "토마토 치즈 비프 버거", "price_krw": 6900},
-    {"id": 7, "name": "빅맥®", "price_krw": 6900},
-    {"id": 8, "name": "맥크리스피™ 디럭스 버거", "price_krw": 7900},
-    {"id": 9, "name": "1955® 버거", "price_krw": 6900},
-    {"id": 10, "name": "맥치킨® 모짜렐라", "price_krw": 6900},
-    {"id": 11, "name": "맥치킨®", "price_krw": 5900},
-    {"id": 12, "name": "더블 불고기 버거", "price_krw": 7900},
-    {"id": 13, "name": "슈슈 버거", "price_krw": 6900},
-    {"id": 14, "name": "슈비 버거", "price_krw": 6900},
-    {"id": 15, "name": "베이컨 토마토 디럭스", "price_krw": 7900},
-    {"id": 16, "name": "더블 치즈버거", "price_krw": 6900},
-    {"id": 17, "name": "트리플 치즈버거", "price_krw": 7900},
-    {"id": 18, "name": "치즈버거", "price_krw": 5900},
-]
-
-
-burger_options = [
-    {"id": 1, "name": "피클", "price_krw": 200},
-]
+# Relative cost (USD per 1M input tokens) used by the "cost" routing policy.
+model_costs = {
+    "openai/gpt-4o-mini": 0.15,
+    "openai/gpt-4o": 2.5,
+    "anthropic/claude-3-5-haiku-latest": 0.8,
+    "anthropic/claude-3-5-sonnet-latest": 3.0,
+}
 
 emotions = [
     "neutral",
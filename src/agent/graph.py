@@ -3,8 +3,8 @@
 This agent returns a predefined response without using an actual LLM.
 """
 
-import ast
 import asyncio
+import dataclasses
 import json
 import logging
 import random
@@ -15,13 +15,18 @@ from langchain.chat_models import init_chat_model
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, START, StateGraph
-from langgraph.prebuilt import ToolNode
 from langgraph.store.base import BaseStore
+from langgraph.types import StreamWriter
 from typing_extensions import Annotated, TypedDict
 
-from agent import utils
+from agent import cart, pricing, speculation, utils
+from agent.admission import AdmissionController, session_priority
+from agent.catalog import catalog
 from agent.configuration import Configuration
-from agent.state import PurchaseInformation, State
+from agent.constants import model_costs
+from agent.profiling import ProfiledToolNode, profiled
+from agent.router import ModelRouter
+from agent.state import State
 
 # from agent.tool_node import tool_node
 from agent.tools import ALL_TOOLS
@@ -31,6 +36,16 @@ logger = logging.getLogger(__name__)
 
 llm = init_chat_model()
 
+admission = AdmissionController()
+
+router = ModelRouter(
+    lambda name: llm.bind_tools(ALL_TOOLS).with_config(
+        configurable=utils.split_model_and_provider(name)
+    ),
+    costs=model_costs,
+    admission=admission,
+)
+
 
 class EmotionalResponse(TypedDict):
     """Emotional response. It's an AI response that includes the response and the related emotion."""
@@ -43,8 +58,9 @@ class EmotionalResponse(TypedDict):
     ]
 
 
+@profiled("agent")
 async def agent(
-    state: State, config: RunnableConfig, *, store: BaseStore
+    state: State, config: RunnableConfig, *, store: BaseStore, writer: StreamWriter
 ) -> Dict[str, Any]:
     """Extract the user's state from the conversation and update the memory."""
     configurable = Configuration.from_runnable_config(config)
@@ -62,19 +78,60 @@ async def agent(
 
     # Prepare the system prompt with user memories and current time
     # This helps the model understand the context and temporal relevance
-    sys = configurable.system_prompt.format(
+    sys = configurable.system_prompt_template.format(
         user_info=formatted, time=datetime.now().isoformat()
     )
 
-    # Invoke the language model with the prepared prompt and tools
-    # "bind_tools" gives the LLM the JSON schema for all tools in the list so it knows how
-    # to use them.
-    msg = await llm.bind_tools(ALL_TOOLS).ainvoke(
-        [{"role": "system", "content": sys}, *state.messages],
-        {"configurable": utils.split_model_and_provider(configurable.model)},
+    # Pin the catalog snapshot for the whole turn; new turns pick up reloads.
+    catalog_version = state.catalog_version
+    if catalog_version is None or isinstance(state.messages[-1], HumanMessage):
+        catalog_version = catalog.current().version
+
+    # Reprice the cart in one pass when the catalog changed since the last turn.
+    update: Dict[str, Any] = {"catalog_version": catalog_version}
+    if state.purchase_information and catalog_version != state.catalog_version:
+        purchase_information = cart.load_purchase_information(
+            state.purchase_information
+        )
+        deltas = cart.reprice(purchase_information, catalog.get(catalog_version))
+        for cart_seq, delta in enumerate(deltas, start=state.cart_seq + 1):
+            writer({**delta, "seq": cart_seq})
+        if deltas:
+            update["purchase_information"] = purchase_information.json()
+            update["cart_seq"] = state.cart_seq + len(deltas)
+
+    # Start the tools the user's message is likely to need while the model thinks.
+    # They see the repriced cart, matching the deltas streamed above.
+    prefetched = speculation.prefetch(
+        dataclasses.replace(
+            state,
+            catalog_version=catalog_version,
+            purchase_information=update.get(
+                "purchase_information", state.purchase_information
+            ),
+        ),
+        config,
     )
 
-    return {"messages": [msg]}
+    # Invoke the language model with the prepared prompt and tools
+    # The router picks the model candidate, hedges slow calls and falls back on errors.
+    # Each provider request goes through admission control, which keeps us under the
+    # provider's rate limits and lets checkout turns go first.
+    try:
+        msg = await router.ainvoke(
+            configurable.model_candidates,
+            [{"role": "system", "content": sys}, *state.messages],
+            policy=configurable.routing_policy,
+            priority=session_priority(state),
+        )
+    except BaseException:
+        speculation.discard(prefetched)
+        raise
+
+    # Answer the tool calls right away if they were all prefetched.
+    tool_messages = await speculation.resolve(msg, prefetched) or []
+
+    return {"messages": [msg, *tool_messages], **update}
 
 
 def should_continue(state: State):
@@ -111,7 +168,8 @@ def should_continue(state: State):
     return [tool_router(tc["name"]) for tc in last_message.tool_calls]
 
 
-def add_burger_to_cart(state: State, config: RunnableConfig):
+@profiled("add_burger_to_cart")
+def add_burger_to_cart(state: State, config: RunnableConfig, writer: StreamWriter):
     """Add a burger item to the cart for later purchase. Update the state with the new purchase information."""
     user_id = Configuration.from_runnable_config(config).user_id
 
@@ -132,27 +190,33 @@ def add_burger_to_cart(state: State, config: RunnableConfig):
             "Expected the last AI message to have a add_burger_to_cart_tool tool call"
         )
 
-    purchase_burger_item = add_burger_to_cart_tool["args"].get("purchase_burger_item")
-
-    if state.purchase_information is None:
-        state.purchase_information = PurchaseInformation()
-
-    else:
-        prev_purchase_information = json.loads(state.purchase_information)
-
-        state.purchase_information = PurchaseInformation(
-            items=ast.literal_eval(prev_purchase_information["items"]),
-            total_price=float(prev_purchase_information["total_price"]),
-            total_items=int(prev_purchase_information["total_items"]),
-            total_quantity=int(prev_purchase_information["total_quantity"]),
+    # Only IDs and quantities come from the model; names and prices from the catalog.
+    args = add_burger_to_cart_tool["args"]
+    try:
+        purchase_burger_item = pricing.build_item(
+            catalog.get(state.catalog_version),
+            args["burger_id"],
+            args.get("quantity", 1),
+            args.get("option_ids") or [],
         )
+    except (KeyError, ValueError) as error:
+        return {
+            "messages": [
+                {
+                    "tool_call_id": add_burger_to_cart_tool["id"],
+                    "role": "tool",
+                    "name": add_burger_to_cart_tool["name"],
+                    "content": f"Could not add the burger to the cart: {error}",
+                }
+            ],
+        }
 
-    state.purchase_information.items.append(purchase_burger_item)
-    state.purchase_information.total_items += 1
-    state.purchase_information.total_quantity += purchase_burger_item["quantity"]
-    state.purchase_information.total_price += (
-        purchase_burger_item["price"] * purchase_burger_item["quantity"]
-    )
+    purchase_information = cart.load_purchase_information(state.purchase_information)
+    delta = cart.add_item(purchase_information, purchase_burger_item)
+
+    # Stream the change so clients can patch their cart instead of re-fetching it.
+    cart_seq = state.cart_seq + 1
+    writer({**delta, "seq": cart_seq})
 
     return {
         "messages": [
@@ -163,11 +227,13 @@ def add_burger_to_cart(state: State, config: RunnableConfig):
                 "content": f"Successfully added {purchase_burger_item['name']} to {user_id}'s cart.",
             }
         ],
-        "purchase_information": state.purchase_information.json(),
+        "purchase_information": purchase_information.json(),
+        "cart_seq": cart_seq,
     }
 
 
-def remove_burger_from_cart(state: State, config: RunnableConfig):
+@profiled("remove_burger_from_cart")
+def remove_burger_from_cart(state: State, config: RunnableConfig, writer: StreamWriter):
     """Remove a burger item from the cart. Update the state with the new purchase information."""
     user_id = Configuration.from_runnable_config(config).user_id
 
@@ -188,29 +254,44 @@ def remove_burger_from_cart(state: State, config: RunnableConfig):
             "Expected the last AI message to have a remove_burger_from_cart_tool tool call"
         )
 
-    purchase_burger_item = remove_burger_from_cart_tool["args"].get(
-        "purchase_burger_item"
-    )
-
-    if state.purchase_information is None:
-        state.purchase_information = PurchaseInformation()
-
-    else:
-        prev_purchase_information = json.loads(state.purchase_information)
+    args = remove_burger_from_cart_tool["args"]
+    snapshot = catalog.get(state.catalog_version)
+    burger_id = args.get("burger_id")
+    purchase_burger_item = {
+        "id": burger_id,
+        "name": getattr(snapshot.menus_by_id.get(burger_id), "name", burger_id),
+        "quantity": args.get("quantity"),
+        "options": args.get("option_ids") or [],
+    }
 
-        state.purchase_information = PurchaseInformation(
-            items=ast.literal_eval(prev_purchase_information["items"]),
-            total_price=float(prev_purchase_information["total_price"]),
-            total_items=int(prev_purchase_information["total_items"]),
-            total_quantity=int(prev_purchase_information["total_quantity"]),
-        )
+    purchase_information = cart.load_purchase_information(state.purchase_information)
+    try:
+        delta = cart.remove_item(purchase_information, purchase_burger_item)
+    except ValueError as error:
+        return {
+            "messages": [
+                {
+                    "tool_call_id": remove_burger_from_cart_tool["id"],
+                    "role": "tool",
+                    "name": remove_burger_from_cart_tool["name"],
+                    "content": f"Could not remove the burger from the cart: {error}",
+                }
+            ],
+        }
+    if delta is None:
+        return {
+            "messages": [
+                {
+                    "tool_call_id": remove_burger_from_cart_tool["id"],
+                    "role": "tool",
+                    "name": remove_burger_from_cart_tool["name"],
+                    "content": f"{purchase_burger_item['name']} is not in {user_id}'s cart.",
+                }
+            ],
+        }
 
-    state.purchase_information.items.remove(purchase_burger_item)
-    state.purchase_information.total_items -= 1
-    state.purchase_information.total_quantity -= purchase_burger_item["quantity"]
-    state.purchase_information.total_price -= (
-        purchase_burger_item["price"] * purchase_burger_item["quantity"]
-    )
+    cart_seq = state.cart_seq + 1
+    writer({**delta, "seq": cart_seq})
 
     return {
         "messages": [
@@ -221,11 +302,15 @@ def remove_burger_from_cart(state: State, config: RunnableConfig):
                 "content": f"Successfully removed {purchase_burger_item['name']} to {user_id}'s cart.",
             }
         ],
-        "purchase_information": state.purchase_information.json(),
+        "purchase_information": purchase_information.json(),
+        "cart_seq": cart_seq,
     }
 
 
-def prepare_purchase_burger_items(state: State, config: RunnableConfig):
+@profiled("prepare_purchase_burger_items")
+def prepare_purchase_burger_items(
+    state: State, config: RunnableConfig, writer: StreamWriter
+):
     """Prepare the purchase of the selected burger items."""
     last_message = state.messages[-1]
     if last_message.type != "ai":
@@ -240,11 +325,9 @@ def prepare_purchase_burger_items(state: State, config: RunnableConfig):
             "Expected the last AI message to have a purchase_burger_items tool call"
         )
 
-    purchase_information = purchase_burger_items_tool["args"].get(
-        "purchase_information"
-    )
+    purchase_information = cart.load_purchase_information(state.purchase_information)
 
-    if not purchase_information:
+    if not purchase_information.items:
         tool_messages = [
             {
                 "role": "tool",
@@ -264,9 +347,21 @@ def prepare_purchase_burger_items(state: State, config: RunnableConfig):
             ],
         }
 
-    return {"purchase_information": purchase_information}
+    # Charge catalog prices, whatever the cart was priced at when filled. The
+    # pinned snapshot may be gone (evicted, worker restarted), so clients are
+    # told about any price that changed.
+    snapshot = catalog.get(state.catalog_version)
+    deltas = cart.reprice(purchase_information, snapshot)
+    for cart_seq, delta in enumerate(deltas, start=state.cart_seq + 1):
+        writer({**delta, "seq": cart_seq})
+    return {
+        "purchase_information": purchase_information.json(),
+        "catalog_version": snapshot.version,
+        "cart_seq": state.cart_seq + len(deltas),
+    }
 
 
+@profiled("purchase_approval")
 async def purchase_approval(state: State, config: RunnableConfig, *, store: BaseStore):
     """Approve a purchase."""
     last_message = state.messages[-1]
@@ -274,11 +369,12 @@ async def purchase_approval(state: State, config: RunnableConfig, *, store: Base
         raise ValueError("Please confirm the purchase before executing.")
 
 
+@profiled("execute_purchase")
 async def execute_purchase(state: State, config: RunnableConfig, *, store: BaseStore):
     """Execute a purchase for the burger order."""
-    purchase_information = state.purchase_information
-    if not purchase_information:
+    if not state.purchase_information:
         raise ValueError("Expected purchase_information to be present")
+    purchase_information = cart.load_purchase_information(state.purchase_information)
 
     tool_call_id = f"tool_{random.random()}"
 
@@ -291,7 +387,7 @@ async def execute_purchase(state: State, config: RunnableConfig, *, store: BaseS
                         "name": "execute_purchase",
                         "id": tool_call_id,
                         "args": {
-                            "purchase_information": purchase_information,
+                            "purchase_information": purchase_information.json(),
                         },
                     }
                 ],
@@ -329,7 +425,7 @@ workflow.add_node("agent", agent)
 
 
 # Tool Node
-workflow.add_node("tools", ToolNode(ALL_TOOLS))
+workflow.add_node("tools", ProfiledToolNode(ALL_TOOLS))
 # workflow.add_node("tools", tool_node)
 
 # Add Burger to Cart Node
@@ -369,6 +465,7 @@ workflow.add_conditional_edges(
     "agent",
     should_continue,
     [
+        "agent",
         "tools",
         END,
         "prepare_purchase_burger_items",
@@ -0,0 +1,137 @@
+"""Catalog-authoritative pricing.
+
+Prices never come from the model: tools pass menu and option IDs, and unit
+prices are read from a ``PriceTable`` precomputed per catalog snapshot. The
+table holds the integer KRW base price of every menu item and the price of
+every option; options are additive, so pricing a whole cart is a single
+vectorized lookup and sum.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Sequence
+
+import numpy as np
+
+from agent.catalog import CatalogSnapshot
+
+
+class PriceTable:
+    """Integer KRW prices of every menu item and option of a catalog."""
+
+    def __init__(self, snapshot: CatalogSnapshot) -> None:
+        """Precompute the prices of ``snapshot``."""
+        self.version = snapshot.version
+        self._rows = {menu.id: row for row, menu in enumerate(snapshot.menus)}
+        self._columns = {
+            option.id: column for column, option in enumerate(snapshot.options)
+        }
+        self.base_prices = np.array(
+            [menu.price_krw for menu in snapshot.menus], dtype=np.int64
+        )
+        self.option_prices = np.array(
+            [option.price_krw for option in snapshot.options], dtype=np.int64
+        )
+        self.base_prices.setflags(write=False)
+        self.option_prices.setflags(write=False)
+
+    def _option_columns(self, option_ids: Iterable[int]) -> list[int]:
+        columns = []
+        for option_id in set(option_ids):
+            if option_id not in self._columns:
+                raise ValueError(f"Unknown option ID: {option_id}")
+            columns.append(self._columns[option_id])
+        return columns
+
+    def unit_price(self, menu_id: int, option_ids: Iterable[int] = ()) -> int:
+        """Return the unit price of a menu item with options."""
+        if menu_id not in self._rows:
+            raise ValueError(f"Unknown burger ID: {menu_id}")
+        columns = self._option_columns(option_ids)
+        return int(
+            self.base_prices[self._rows[menu_id]] + self.option_prices[columns].sum()
+        )
+
+    def unit_prices_for(self, items: Sequence[dict[str, Any]]) -> np.ndarray:
+        """Return the unit prices of cart lines in one vectorized lookup.
+
+        Lines whose menu item or options are no longer in the catalog keep
+        their current price.
+        """
+        rows = np.fromiter(
+            (self._rows.get(item["id"], -1) for item in items),
+            dtype=np.int64,
+            count=len(items),
+        )
+        selected = np.zeros((len(items), len(self.option_prices)), dtype=np.int64)
+        for index, item in enumerate(items):
+            try:
+                selected[index, self._option_columns(line_option_ids(item))] = 1
+            except ValueError:
+                rows[index] = -1
+        current = np.array([item["price"] for item in items], dtype=np.int64)
+        known = rows >= 0
+        prices = (
+            self.base_prices[np.where(known, rows, 0)] + selected @ self.option_prices
+        )
+        return np.where(known, prices, current)
+
+
+def line_option_ids(item: dict[str, Any]) -> list[int]:
+    """Return the option IDs of a cart line."""
+    return [
+        option["id"] if isinstance(option, dict) else option
+        for option in item.get("options", [])
+    ]
+
+
+_tables: OrderedDict[str, PriceTable] = OrderedDict()
+_tables_lock = threading.Lock()
+
+
+def price_table(snapshot: CatalogSnapshot) -> PriceTable:
+    """Return the price table of ``snapshot``, building it on first use."""
+    with _tables_lock:
+        table = _tables.get(snapshot.version)
+        if table is None:
+            table = _tables[snapshot.version] = PriceTable(snapshot)
+            while len(_tables) > 8:
+                _tables.popitem(last=False)
+        return table
+
+
+def build_item(
+    snapshot: CatalogSnapshot,
+    burger_id: int,
+    quantity: int = 1,
+    option_ids: Iterable[int] = (),
+) -> dict[str, Any]:
+    """Build a priced cart line from IDs.
+
+    ``price`` is the unit price including the options.
+    """
+    if burger_id not in snapshot.menus_by_id:
+        raise ValueError(f"Unknown burger ID: {burger_id}")
+    if quantity < 1:
+        raise ValueError("Expected a quantity of at least 1")
+    option_ids = sorted(set(option_ids))
+    unknown = [i for i in option_ids if i not in snapshot.options_by_id]
+    if unknown:
+        raise ValueError(f"Unknown option ID: {unknown[0]}")
+
+    return {
+        "id": burger_id,
+        "name": snapshot.menus_by_id[burger_id].name,
+        "price": price_table(snapshot).unit_price(burger_id, option_ids),
+        "quantity": quantity,
+        "options": [
+            {
+                "id": option_id,
+                "name": snapshot.options_by_id[option_id].name,
+                "price": snapshot.options_by_id[option_id].price_krw,
+            }
+            for option_id in option_ids
+        ],
+    }
@@ -0,0 +1,293 @@
+"""On-demand sampling profiler for single conversations.
+
+Profiling is enabled per user or thread by listing its ``user_id`` or
+``thread_id`` in ``Configuration.profile_targets``. While a targeted run is
+inside a graph node, a background thread samples the stacks of all threads and
+keeps the ones doing work for that node: the node's own thread for sync nodes,
+on the event loop any task created on behalf of the node (model calls, tool
+calls, ...), and the default executor threads running functions submitted by
+those tasks (``asyncio.to_thread``, sync tools, ...). Samples are rooted at the graph node name and written in
+collapsed-stack format (one ``frame;frame;frame count`` line per stack) to
+``<profile_dir>/<target>.collapsed``, which flamegraph.pl, inferno or
+speedscope turn into a flamegraph.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import FrameType
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.prebuilt import ToolNode
+
+from agent.configuration import Configuration
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+SAMPLE_INTERVAL = 0.005
+"""Seconds between two stack samples."""
+
+_ASYNCIO_EVENTS = os.path.join("asyncio", "events.py")
+
+# (target, node) of the profiled node the current context is working for.
+_active: contextvars.ContextVar[Optional[tuple[str, str]]] = contextvars.ContextVar(
+    "agent_profile_active", default=None
+)
+
+
+@dataclass
+class _Session:
+    """Samples collected for one profiling target."""
+
+    profile_dir: str
+    active: int = 0
+    samples: Counter[str] = field(default_factory=Counter)
+
+
+class _ProfiledExecutor(ThreadPoolExecutor):
+    """Default executor attributing its threads to the submitting node."""
+
+    def __init__(self, profiler: SamplingProfiler) -> None:
+        """Initialize the executor for ``profiler``."""
+        super().__init__(thread_name_prefix="asyncio")
+        self._profiler = profiler
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        """Submit ``fn``, tagged with the node the caller is working for."""
+        tag = _active.get()
+        if tag is None:
+            return super().submit(fn, *args, **kwargs)
+        return super().submit(self._profiler._run_tagged, tag, fn, *args, **kwargs)
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class SamplingProfiler:
+    """Background stack sampler attributing samples to graph nodes."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL) -> None:
+        """Initialize the sampling profiler."""
+        self.interval = interval
+        self._sessions: dict[str, _Session] = {}
+        self._threads: dict[int, tuple[str, str]] = {}
+        self._loops: dict[int, asyncio.AbstractEventLoop] = {}
+        self._tasks: weakref.WeakKeyDictionary[asyncio.Future[Any], tuple[str, str]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _target(self, config: Optional[RunnableConfig]) -> Optional[str]:
+        configuration = Configuration.from_runnable_config(config)
+        targets = configuration.profile_target_set
+        if not targets:
+            return None
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        keys = [configuration.user_id]
+        if thread_id:
+            keys.insert(0, str(thread_id))
+        return next((key for key in keys if key in targets), None)
+
+    def _watch_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Tag the tasks created on ``loop`` by profiled nodes."""
+        self._loops[threading.get_ident()] = loop
+        previous = loop.get_task_factory()
+        if getattr(previous, "_agent_profiler", None) is self:
+            return
+
+        def factory(loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> Any:
+            if previous is not None:
+                task = previous(loop, coro, **kwargs)
+            else:
+                task = asyncio.Task(coro, loop=loop, **kwargs)
+            tag = _active.get()
+            if tag is not None:
+                self._tasks[task] = tag
+            return task
+
+        factory._agent_profiler = self  # type: ignore[attr-defined]
+        loop.set_task_factory(factory)
+        loop.set_default_executor(_ProfiledExecutor(self))
+
+    def _run_tagged(
+        self, tag: tuple[str, str], fn: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        """Run ``fn`` on an executor thread attributed to ``tag``."""
+        ident = threading.get_ident()
+        with self._lock:
+            previous = self._threads.get(ident)
+            self._threads[ident] = tag
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                if previous is None:
+                    self._threads.pop(ident, None)
+                else:
+                    self._threads[ident] = previous
+
+    @contextmanager
+    def session(self, config: Optional[RunnableConfig], node: str) -> Iterator[None]:
+        """Sample the work of ``node`` while inside the block, if targeted."""
+        target = self._target(config)
+        if target is None:
+            yield
+            return
+
+        tag = (target, node)
+        token = _active.set(tag)
+        try:
+            task: Optional[asyncio.Future[Any]] = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        ident = threading.get_ident()
+        with self._lock:
+            if task is not None:
+                self._watch_loop(task.get_loop())
+                previous = self._tasks.get(task)
+                self._tasks[task] = tag
+            else:
+                previous = self._threads.get(ident)
+                self._threads[ident] = tag
+            session = self._sessions.setdefault(
+                target, _Session(Configuration.from_runnable_config(config).profile_dir)
+            )
+            session.active += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="agent-profiler", daemon=True
+                )
+                self._thread.start()
+        try:
+            yield
+        finally:
+            _active.reset(token)
+            with self._lock:
+                owner: Any = self._tasks if task is not None else self._threads
+                key: Any = task if task is not None else ident
+                if previous is None:
+                    owner.pop(key, None)
+                else:
+                    owner[key] = previous
+                session.active -= 1
+                samples: Counter[str] = Counter()
+                if session.active == 0:
+                    del self._sessions[target]
+                    samples, session.samples = session.samples, samples
+            if samples:
+                self._flush(target, session.profile_dir, samples)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+            self._sample()
+            time.sleep(self.interval)
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        frames = sys._current_frames()
+        with self._lock:
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                tag = self._threads.get(ident)
+                loop = self._loops.get(ident)
+                if tag is None and loop is not None:
+                    task = asyncio.current_task(loop)
+                    tag = self._tasks.get(task) if task is not None else None
+                if tag is None or tag[0] not in self._sessions:
+                    continue
+
+                labels: list[str] = []
+                current: Optional[FrameType] = frame
+                while current is not None:
+                    # Event loop and executor machinery above the work is not useful.
+                    if (
+                        current.f_code.co_filename.endswith(_ASYNCIO_EVENTS)
+                        or current.f_code is _RUN_TAGGED_CODE
+                    ):
+                        break
+                    labels.append(_frame_label(current))
+                    current = current.f_back
+                target, node = tag
+                self._sessions[target].samples[";".join([node, *reversed(labels)])] += 1
+
+    def _flush(self, target: str, profile_dir: str, samples: Counter[str]) -> None:
+        os.makedirs(profile_dir, exist_ok=True)
+        path = os.path.join(profile_dir, f"{target}.collapsed")
+        merged: Counter[str] = Counter()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    stack, _, count = line.rstrip("\n").rpartition(" ")
+                    if stack:
+                        merged[stack] += int(count)
+        merged.update(samples)
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in merged.items())
+        logger.info("Wrote %d profile samples to %s", sum(samples.values()), path)
+
+
+_RUN_TAGGED_CODE = SamplingProfiler._run_tagged.__code__
+
+profiler = SamplingProfiler()
+
+
+def profiled(node: str) -> Callable[[F], F]:
+    """Profile a graph node function for targeted runs."""
+
+    def decorator(func: F) -> F:
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def awrapper(*args: Any, **kwargs: Any) -> Any:
+                with profiler.session(kwargs.get("config"), node):
+                    return await func(*args, **kwargs)
+
+            return awrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with profiler.session(kwargs.get("config"), node):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+class ProfiledToolNode(ToolNode):
+    """ToolNode whose tool calls are profiled for targeted runs."""
+
+    @functools.wraps(ToolNode._func)
+    def _func(self, *args: Any, **kwargs: Any) -> Any:
+        with profiler.session(kwargs.get("config"), self.name):
+            return super()._func(*args, **kwargs)
+
+    @functools.wraps(ToolNode._afunc)
+    async def _afunc(self, *args: Any, **kwargs: Any) -> Any:
+        with profiler.session(kwargs.get("config"), self.name):
+            return await super()._afunc(*args, **kwargs)
@@ -0,0 +1,307 @@
+"""Route chat model calls across an ordered list of provider/model candidates.
+
+The router keeps a moving latency and error profile for every candidate. Each
+call goes to the best-ranked candidate; if it has not answered by the time its
+latency percentile deadline passes, a hedged request is sent to the next
+candidate and whichever answers first wins. Failed calls fall back to the next
+candidate in order.
+
+When the router is given an ``AdmissionController``, every provider request,
+hedges included, holds its own admission slot, so the controller sees each
+request in flight and each rate limit error, even when a fallback succeeds.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Literal, Mapping, Optional, Sequence
+
+from langchain_core.runnables import Runnable
+
+from agent.admission import PRIORITY_BROWSING, AdmissionController
+
+logger = logging.getLogger(__name__)
+
+RoutingPolicy = Literal["latency", "cost", "priority"]
+
+
+@dataclass
+class CandidateStats:
+    """Moving latency and error profile of a single candidate."""
+
+    window: int = 50
+    alpha: float = 0.2
+    latencies: deque[float] = field(init=False)
+    ewma_latency: Optional[float] = None
+    error_rate: float = 0.0
+    calls: int = 0
+
+    def __post_init__(self) -> None:
+        """Create the bounded latency window."""
+        self.latencies = deque(maxlen=self.window)
+
+    def record_success(self, latency: float) -> None:
+        """Record the latency of a successful call."""
+        self.calls += 1
+        self.latencies.append(latency)
+        self.ewma_latency = (
+            latency
+            if self.ewma_latency is None
+            else self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+        )
+        self.error_rate *= 1 - self.alpha
+
+    def record_censored(self, latency: float) -> None:
+        """Record a call abandoned after ``latency`` because another one won.
+
+        The true latency is at least ``latency``. A lower bound above the moving
+        average is recorded like a sample, so a candidate that slowed down drops
+        in the ranking even though its calls never complete; one below it says
+        nothing new and is ignored.
+        """
+        self.calls += 1
+        if self.ewma_latency is None or latency <= self.ewma_latency:
+            return
+        self.latencies.append(latency)
+        self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+
+    def record_error(self) -> None:
+        """Record a failed call."""
+        self.calls += 1
+        self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the ``q`` latency percentile (0-1) of the recent window."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+        return ordered[index]
+
+    def expected_latency(self) -> float:
+        """Return the latency penalized by the error rate, or inf when unknown."""
+        if self.ewma_latency is None:
+            return math.inf
+        return self.ewma_latency / max(1 - self.error_rate, 0.05)
+
+
+@dataclass
+class _Attempt:
+    candidate: str
+    admitted: asyncio.Event = field(default_factory=asyncio.Event)
+    started: Optional[float] = None
+    """When the request was admitted and sent to the provider."""
+
+
+class ModelRouter:
+    """Latency-aware router with hedged requests and ordered fallback.
+
+    Args:
+        model_factory: Build the runnable used to call a candidate, given its
+            ``provider/model-name`` string.
+        costs: Relative cost per candidate, used by the ``"cost"`` policy.
+        hedge_percentile: Latency percentile of the primary candidate after
+            which a hedged request is sent.
+        default_hedge_delay: Hedge deadline in seconds used until a candidate
+            has ``min_samples`` latency samples.
+        min_samples: Number of samples required before trusting the percentile.
+        max_hedges: Maximum number of hedged requests sent per call.
+        max_error_rate: Candidates above this error rate are tried last by the
+            ``"cost"`` policy.
+        admission: Controller every provider request is admitted through.
+    """
+
+    def __init__(
+        self,
+        model_factory: Callable[[str], Runnable],
+        *,
+        costs: Optional[Mapping[str, float]] = None,
+        hedge_percentile: float = 0.95,
+        default_hedge_delay: float = 5.0,
+        min_samples: int = 5,
+        max_hedges: int = 1,
+        max_error_rate: float = 0.5,
+        admission: Optional[AdmissionController] = None,
+    ) -> None:
+        """Initialize the model router."""
+        self.model_factory = model_factory
+        self.costs = dict(costs or {})
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+        self.max_error_rate = max_error_rate
+        self.admission = admission
+        self.stats: dict[str, CandidateStats] = {}
+        self._models: dict[str, Runnable] = {}
+
+    def _stats(self, candidate: str) -> CandidateStats:
+        if candidate not in self.stats:
+            self.stats[candidate] = CandidateStats()
+        return self.stats[candidate]
+
+    def _model(self, candidate: str) -> Runnable:
+        if candidate not in self._models:
+            self._models[candidate] = self.model_factory(candidate)
+        return self._models[candidate]
+
+    def rank(
+        self, candidates: Sequence[str], policy: RoutingPolicy = "latency"
+    ) -> list[str]:
+        """Order the candidates according to the routing policy.
+
+        Ties, including candidates without any latency samples, keep their
+        configured order.
+        """
+        unique = list(dict.fromkeys(candidates))
+        if policy == "priority":
+            return unique
+        if policy == "latency":
+            return sorted(unique, key=lambda c: self._stats(c).expected_latency())
+        if policy == "cost":
+            return sorted(
+                unique,
+                key=lambda c: (
+                    self._stats(c).error_rate > self.max_error_rate,
+                    self.costs.get(c, math.inf),
+                ),
+            )
+        raise ValueError(f"Unknown routing policy: {policy}")
+
+    def hedge_delay(self, candidate: str) -> float:
+        """Return how long to wait on ``candidate`` before hedging."""
+        stats = self._stats(candidate)
+        if len(stats.latencies) < self.min_samples:
+            return self.default_hedge_delay
+        return stats.percentile(self.hedge_percentile) or self.default_hedge_delay
+
+    async def _call(
+        self,
+        attempt: _Attempt,
+        input: Any,
+        config: Any,
+        priority: int,
+        settled: asyncio.Event,
+    ) -> Any:
+        admit = (
+            self.admission.admit(priority)
+            if self.admission is not None
+            else contextlib.nullcontext()
+        )
+        async with admit:
+            # A hedge admitted after another attempt won must not reach the provider.
+            if settled.is_set():
+                raise asyncio.CancelledError
+            attempt.started = time.perf_counter()
+            attempt.admitted.set()
+            stats = self._stats(attempt.candidate)
+            try:
+                result = await self._model(attempt.candidate).ainvoke(input, config)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                stats.record_error()
+                raise
+            stats.record_success(time.perf_counter() - attempt.started)
+            # Settle before the admission slot is handed to a queued hedge.
+            settled.set()
+            return result
+
+    async def ainvoke(
+        self,
+        candidates: Sequence[str],
+        input: Any,
+        config: Any = None,
+        *,
+        policy: RoutingPolicy = "latency",
+        priority: int = PRIORITY_BROWSING,
+    ) -> Any:
+        """Call the best candidate, hedging and falling back as needed.
+
+        ``priority`` is the admission priority of the provider requests. The
+        hedge deadline of a request starts when it is admitted, so time spent
+        waiting for admission neither triggers hedges nor counts against the
+        provider's latency.
+
+        Returns the first successful result. If every candidate fails, the last
+        error is raised.
+        """
+        queue = self.rank(candidates, policy)
+        if not queue:
+            raise ValueError("Expected at least one model candidate")
+
+        pending: dict[asyncio.Task[Any], _Attempt] = {}
+        settled = asyncio.Event()
+        errors: list[BaseException] = []
+        hedges = 0
+        admission_wait: Optional[asyncio.Task[Any]] = None
+
+        def launch() -> _Attempt:
+            attempt = _Attempt(queue.pop(0))
+            task = asyncio.ensure_future(
+                self._call(attempt, input, config, priority, settled)
+            )
+            pending[task] = attempt
+            return attempt
+
+        last = launch()
+        try:
+            while pending:
+                timeout = None
+                if queue and hedges < self.max_hedges:
+                    if last.started is None:
+                        admission_wait = asyncio.ensure_future(last.admitted.wait())
+                    else:
+                        deadline = last.started + self.hedge_delay(last.candidate)
+                        timeout = max(0.0, deadline - time.perf_counter())
+                done, _ = await asyncio.wait(
+                    [*pending, *filter(None, [admission_wait])],
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if admission_wait is not None:
+                    # The hedge deadline is known once the request is admitted.
+                    admission_wait.cancel()
+                    done.discard(admission_wait)
+                    admission_wait = None
+                    if not done:
+                        continue
+                if not done:
+                    hedges += 1
+                    logger.info("Hedging slow model %s", last.candidate)
+                    last = launch()
+                    continue
+
+                for task in done:
+                    attempt = pending.pop(task)
+                    if task.cancelled():
+                        continue
+                    error = task.exception()
+                    if error is None:
+                        # The calls still running lost the race, record how long
+                        # they took at least.
+                        now = time.perf_counter()
+                        for loser in pending.values():
+                            if loser.started is not None:
+                                self._stats(loser.candidate).record_censored(
+                                    now - loser.started
+                                )
+                        return task.result()
+                    logger.warning("Model %s failed: %r", attempt.candidate, error)
+                    errors.append(error)
+
+                if not pending and queue:
+                    last = launch()
+        finally:
+            if admission_wait is not None:
+                admission_wait.cancel()
+            for task in pending:
+                task.cancel()
+
+        raise errors[-1]
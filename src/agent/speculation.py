@@ -0,0 +1,140 @@
+"""Speculative tool prefetch, run concurrently with the model call.
+
+A cheap keyword classifier looks at the user's message and guesses which
+argument-free tools the model is about to call (suggestions, cart view). Those
+tools start running while the model call is in flight. If the model then asks
+for exactly those tools, their results are returned right away as
+``ToolMessage``s and the tools round trip is skipped; otherwise the model's
+tool calls go through the tools node as usual.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from langgraph.prebuilt.tool_node import msg_content_output
+
+from agent.state import State
+from agent.tools import get_current_purchase_information, suggest_burgers
+
+logger = logging.getLogger(__name__)
+
+# Tools without model-provided arguments, and the keywords that predict them.
+PREFETCHABLE_TOOLS: dict[str, tuple[BaseTool, tuple[str, ...]]] = {
+    suggest_burgers.name: (
+        suggest_burgers,
+        ("추천", "메뉴", "뭐 먹", "뭐먹", "recommend", "suggest", "menu"),
+    ),
+    get_current_purchase_information.name: (
+        get_current_purchase_information,
+        ("장바구니", "카트", "담은", "주문 내역", "cart", "basket", "my order"),
+    ),
+}
+
+
+@dataclass
+class SpeculationStats:
+    """Hit and waste counters of the speculative prefetch."""
+
+    prefetched: int = 0
+    hits: int = 0
+    wasted: int = 0
+    misses: int = 0
+    """Prefetchable tools the model called that were not predicted."""
+
+    @property
+    def hit_rate(self) -> float:
+        """Return the share of prefetched tools that the model used."""
+        return self.hits / self.prefetched if self.prefetched else 0.0
+
+    @property
+    def waste_rate(self) -> float:
+        """Return the share of prefetched tools that were thrown away."""
+        return self.wasted / self.prefetched if self.prefetched else 0.0
+
+
+stats = SpeculationStats()
+
+
+def classify(message: Any) -> list[str]:
+    """Return the names of the tools the message is likely to need."""
+    if not isinstance(message, HumanMessage) or not isinstance(message.content, str):
+        return []
+    text = message.content.lower()
+    return [
+        name
+        for name, (_, keywords) in PREFETCHABLE_TOOLS.items()
+        if any(keyword in text for keyword in keywords)
+    ]
+
+
+def prefetch(state: State, config: RunnableConfig) -> dict[str, asyncio.Task[Any]]:
+    """Start the tools predicted for the last message of the conversation."""
+    tasks = {}
+    for name in classify(state.messages[-1]):
+        tool = PREFETCHABLE_TOOLS[name][0]
+        task = asyncio.ensure_future(tool.ainvoke({"state": state}, config))
+        # Failures are reported by resolve() if the result is used, never otherwise.
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        tasks[name] = task
+    stats.prefetched += len(tasks)
+    return tasks
+
+
+def discard(tasks: dict[str, asyncio.Task[Any]]) -> None:
+    """Cancel prefetched tools whose results will not be used."""
+    for task in tasks.values():
+        task.cancel()
+    stats.wasted += len(tasks)
+
+
+async def resolve(
+    msg: AIMessage, tasks: dict[str, asyncio.Task[Any]]
+) -> Optional[list[ToolMessage]]:
+    """Answer the model's tool calls from the prefetched results.
+
+    Returns the tool messages if every tool call was prefetched, or None if the
+    calls have to go through the tools node.
+    """
+    tool_calls = msg.tool_calls
+    usable = bool(tool_calls) and all(
+        tc["name"] in tasks and not tc["args"] for tc in tool_calls
+    )
+    used = {tc["name"] for tc in tool_calls} & tasks.keys() if usable else set()
+
+    tool_messages: Optional[list[ToolMessage]] = None
+    if usable:
+        try:
+            outputs = {name: await tasks[name] for name in used}
+        except Exception as error:
+            logger.warning("Speculative prefetch failed: %r", error)
+            used = set()
+        else:
+            tool_messages = [
+                ToolMessage(
+                    content=msg_content_output(outputs[tc["name"]]),
+                    name=tc["name"],
+                    tool_call_id=tc["id"],
+                )
+                for tc in tool_calls
+            ]
+
+    for name, task in tasks.items():
+        if name not in used:
+            task.cancel()
+    stats.hits += len(used)
+    stats.wasted += len(tasks) - len(used)
+    stats.misses += len(
+        {tc["name"] for tc in tool_calls if tc["name"] in PREFETCHABLE_TOOLS}
+        - tasks.keys()
+    )
+    logger.debug(
+        "Speculation hit rate %.2f, waste rate %.2f", stats.hit_rate, stats.waste_rate
+    )
+    return tool_messages
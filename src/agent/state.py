@@ -72,6 +72,10 @@ class State:
 
     messages: Annotated[list[AnyMessage], add_messages]
     purchase_information: Optional[PurchaseInformation] = field(default=None)
+    cart_seq: int = 0
+    """Sequence number of the last cart delta streamed to the client."""
+    catalog_version: Optional[str] = None
+    """Catalog snapshot version the current turn is pinned to."""
 
     def dict(self):
         """Return the state as a dictionary."""
@@ -1,6 +1,7 @@
 """Define he agent's tools."""
 
 import uuid
+from dataclasses import asdict
 from typing import Annotated, Any, Optional, cast
 
 import pandas as pd
@@ -10,12 +11,13 @@ from langchain_core.tools import InjectedToolArg, tool
 from langgraph.prebuilt import InjectedState
 from langgraph.store.base import BaseStore
 
-from agent import utils
+from agent import cart, pricing, utils
+from agent.catalog import catalog
 from agent.configuration import Configuration
-from agent.constants import burger_menus, emotions
+from agent.constants import emotions
 
 # from agent.graph import EmotionalResponse
-from agent.state import PurchaseBurgerItem, PurchaseInformation, State
+from agent.state import State
 
 
 @tool
@@ -58,8 +60,12 @@ async def suggest_burgers(
     """
     # TODO: Implement the search logic here.
     # user_id = Configuration.from_runnable_config(config).user_id
+    snapshot = catalog.get(state.catalog_version)
 
-    return {"burgerItems": burger_menus}
+    return {
+        "burgerItems": [asdict(menu) for menu in snapshot.menus],
+        "options": [asdict(option) for option in snapshot.options],
+    }
 
 
 # @tool
@@ -79,16 +85,16 @@ async def suggest_burgers(
 
 @tool
 async def purchase_burger_items(
-    purchase_information: PurchaseInformation,
     *,
     config: Annotated[RunnableConfig, InjectedToolArg],
     state: Annotated[State, InjectedState],
 ):
-    """Purchase the selected burger items.
+    """Purchase the burger items in the cart.
 
     This tool will be called when the user confirms the purchase of the burger.
     """
     user_id = Configuration.from_runnable_config(config).user_id
+    purchase_information = cart.load_purchase_information(state.purchase_information)
     return f"Confirmed purchase of {purchase_information.total_quantity} for {user_id}."
 
 
@@ -107,7 +113,9 @@ async def get_current_purchase_information(
 
 @tool
 def add_burger_to_cart_tool(
-    purchase_burger_item: PurchaseBurgerItem,
+    burger_id: int,
+    quantity: int = 1,
+    option_ids: Optional[list[int]] = None,
     *,
     config: Annotated[RunnableConfig, InjectedToolArg],
     state: Annotated[State, InjectedState],
@@ -115,23 +123,22 @@ def add_burger_to_cart_tool(
     """Add a burger item to the cart for later purchase.
 
     This tool will be called when the user wants to add a burger to the cart.
+    Prices come from the catalog, so only the burger and option IDs are needed.
     """
-    if state.purchase_information is None:
-        state.purchase_information = PurchaseInformation()
-
-    state.purchase_information.items.append(purchase_burger_item)
-    state.purchase_information.total_items += 1
-    state.purchase_information.total_quantity += purchase_burger_item.quantity
-    state.purchase_information.total_price += (
-        purchase_burger_item.price * purchase_burger_item.quantity
+    purchase_information = cart.load_purchase_information(state.purchase_information)
+    item = pricing.build_item(
+        catalog.get(state.catalog_version), burger_id, quantity, option_ids or []
     )
+    cart.add_item(purchase_information, item)
 
-    return state.purchase_information.json()
+    return purchase_information.json()
 
 
 @tool
 def remove_burger_from_cart_tool(
-    purchase_burger_item: PurchaseBurgerItem,
+    burger_id: int,
+    quantity: Optional[int] = None,
+    option_ids: Optional[list[int]] = None,
     *,
     config: Annotated[RunnableConfig, InjectedToolArg],
     state: Annotated[State, InjectedState],
@@ -139,18 +146,15 @@ def remove_burger_from_cart_tool(
     """Remove a burger item from the cart.
 
     This tool will be called when the user wants to remove a burger from the cart.
+    Leave the quantity empty to remove all of them.
     """
-    if state.purchase_information is None:
-        state.purchase_information = PurchaseInformation()
-
-    state.purchase_information.items.remove(purchase_burger_item)
-    state.purchase_information.total_items -= 1
-    state.purchase_information.total_quantity -= purchase_burger_item.quantity
-    state.purchase_information.total_price -= (
-        purchase_burger_item.price * purchase_burger_item.quantity
+    purchase_information = cart.load_purchase_information(state.purchase_information)
+    cart.remove_item(
+        purchase_information,
+        {"id": burger_id, "quantity": quantity, "options": option_ids or []},
     )
 
-    return state.purchase_information.json()
+    return purchase_information.json()
 
 
 # @tool
@@ -1,5 +1,8 @@
 """Utility functions used in our graph."""
 
+import string
+from typing import Any, Optional
+
 
 def split_model_and_provider(fully_specified_name: str) -> dict:
     """Initialize the configured chat model."""
@@ -9,3 +12,32 @@ def split_model_and_provider(fully_specified_name: str) -> dict:
         provider = None
         model = fully_specified_name
     return {"model": model, "provider": provider}
+
+
+class CompiledPrompt:
+    """A prompt template parsed once and formatted without re-parsing.
+
+    Only plain ``{name}`` fields are compiled; templates using format specs,
+    conversions or positional fields fall back to ``str.format``.
+    """
+
+    def __init__(self, template: str) -> None:
+        """Parse the template."""
+        self.template = template
+        self._parts: Optional[list[tuple[str, Optional[str]]]] = []
+        for literal, name, spec, conversion in string.Formatter().parse(template):
+            if name is not None and (spec or conversion or not name.isidentifier()):
+                self._parts = None
+                break
+            self._parts.append((literal, name))
+
+    def format(self, **kwargs: Any) -> str:
+        """Return the template filled in with ``kwargs``."""
+        if self._parts is None:
+            return self.template.format(**kwargs)
+        return "".join(
+            [
+                literal if name is None else f"{literal}{kwargs[name]}"
+                for literal, name in self._parts
+            ]
+        )
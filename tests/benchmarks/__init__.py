@@ -0,0 +1 @@
+"""Micro-benchmarks, run with `make benchmark`."""
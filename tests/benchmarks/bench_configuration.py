@@ -0,0 +1,61 @@
+"""Compare per-turn configuration handling before and after per-run caching.
+
+A turn resolves the configuration once in ``agent``, once per cart node or tool
+call, and formats the system prompt once.
+"""
+
+import os
+import timeit
+from dataclasses import fields
+from datetime import datetime
+
+from agent.configuration import Configuration
+
+CONFIG = {
+    "configurable": {
+        "thread_id": "bench-thread",
+        "user_id": "bench-user",
+        "model": "openai/gpt-4o-mini",
+    }
+}
+RESOLUTIONS_PER_TURN = 4
+NUMBER = 5_000
+
+
+def legacy_from_runnable_config(config):
+    # Configuration.from_runnable_config before per-run caching.
+    configurable = config["configurable"] if config and "configurable" in config else {}
+    values = {
+        f.name: os.environ.get(f.name.upper(), configurable.get(f.name))
+        for f in fields(Configuration)
+        if f.init
+    }
+    return Configuration(**{k: v for k, v in values.items() if v})
+
+
+def legacy_turn() -> None:
+    for _ in range(RESOLUTIONS_PER_TURN):
+        configurable = legacy_from_runnable_config(CONFIG)
+    configurable.system_prompt.format(
+        user_info="<memories></memories>", time=datetime.now().isoformat()
+    )
+
+
+def cached_turn() -> None:
+    for _ in range(RESOLUTIONS_PER_TURN):
+        configurable = Configuration.from_runnable_config(CONFIG)
+    configurable.system_prompt_template.format(
+        user_info="<memories></memories>", time=datetime.now().isoformat()
+    )
+
+
+def main() -> None:
+    legacy = min(timeit.repeat(legacy_turn, number=NUMBER, repeat=5)) / NUMBER
+    cached = min(timeit.repeat(cached_turn, number=NUMBER, repeat=5)) / NUMBER
+    print(f"legacy turn: {legacy * 1e6:8.2f} us")  # noqa: T201
+    print(f"cached turn: {cached * 1e6:8.2f} us")  # noqa: T201
+    print(f"speedup:     {legacy / cached:8.1f}x")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agent import cart
+from agent.admission import (
+    PRIORITY_APPROVAL,
+    PRIORITY_BROWSING,
+    PRIORITY_CART,
+    AdmissionController,
+    session_priority,
+)
+from agent.state import PurchaseInformation, State
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+@pytest.mark.asyncio
+async def test_admission_serves_higher_priority_first() -> None:
+    controller = AdmissionController(initial_limit=1)
+    order: list[str] = []
+    release = asyncio.Event()
+
+    async def call(name: str, priority: int) -> None:
+        async with controller.admit(priority):
+            order.append(name)
+            await release.wait()
+
+    holder = asyncio.create_task(call("holder", PRIORITY_BROWSING))
+    await asyncio.sleep(0)
+    browsing = asyncio.create_task(call("browsing", PRIORITY_BROWSING))
+    await asyncio.sleep(0)
+    checkout = asyncio.create_task(call("checkout", PRIORITY_APPROVAL))
+    await asyncio.sleep(0)
+    assert controller.queue_depth == 2
+
+    release.set()
+    await asyncio.gather(holder, browsing, checkout)
+    assert order == ["holder", "checkout", "browsing"]
+    assert controller.stats()["admitted"] == 3
+
+
+@pytest.mark.asyncio
+async def test_admission_backs_off_on_rate_limit() -> None:
+    controller = AdmissionController(initial_limit=8)
+    with pytest.raises(RateLimitError):
+        async with controller.admit():
+            raise RateLimitError()
+    assert controller.limit == 4
+    assert controller.in_flight == 0
+
+    async with controller.admit():
+        pass
+    assert controller.limit > 4
+
+
+def test_session_priority() -> None:
+    purchase = AIMessage(
+        content="",
+        tool_calls=[{"name": "purchase_burger_items", "args": {}, "id": "p"}],
+    )
+    declined = [
+        purchase,
+        ToolMessage(content="no", tool_call_id="p"),
+        AIMessage(content="Okay, maybe later."),
+        HumanMessage(content="what's new?"),
+    ]
+    info = PurchaseInformation()
+    cart.add_item(
+        info, {"id": 7, "name": "빅맥®", "price": 6900, "quantity": 1, "options": []}
+    )
+
+    assert session_priority(State(messages=[purchase])) == PRIORITY_APPROVAL
+    assert session_priority(State(messages=declined)) == PRIORITY_BROWSING
+    assert (
+        session_priority(State(messages=declined, purchase_information=info.json()))
+        == PRIORITY_CART
+    )
+    empty = PurchaseInformation().json()
+    assert (
+        session_priority(State(messages=declined, purchase_information=empty))
+        == PRIORITY_BROWSING
+    )
@@ -0,0 +1,50 @@
+import pytest
+
+from agent import cart
+from agent.state import PurchaseInformation
+
+BIG_MAC = {"id": 7, "name": "빅맥®", "price": 6900, "quantity": 1, "options": []}
+
+
+def test_cart_deltas_merge_and_remove_lines() -> None:
+    info = PurchaseInformation()
+
+    delta = cart.add_item(info, BIG_MAC)
+    assert (delta["op"], delta["index"]) == ("add", 0)
+
+    delta = cart.add_item(info, {**BIG_MAC, "quantity": 2})
+    assert delta["op"] == "update"
+    assert delta["item"]["quantity"] == 3
+    assert delta["totals"] == {
+        "total_price": 20700,
+        "total_items": 1,
+        "total_quantity": 3,
+    }
+
+    delta = cart.remove_item(info, {**BIG_MAC, "quantity": 3})
+    assert delta is not None
+    assert delta["op"] == "remove"
+    assert "item" not in delta
+    assert info.items == []
+
+
+def test_remove_missing_item_returns_none() -> None:
+    assert cart.remove_item(PurchaseInformation(), BIG_MAC) is None
+
+
+def test_load_purchase_information_round_trip() -> None:
+    info = PurchaseInformation()
+    cart.add_item(info, BIG_MAC)
+    loaded = cart.load_purchase_information(info.json())
+    assert loaded.items == info.items
+    assert loaded.total_price == 6900
+
+
+def test_remove_item_rejects_non_positive_quantity() -> None:
+    info = PurchaseInformation()
+    cart.add_item(info, BIG_MAC)
+    for quantity in (0, -3):
+        with pytest.raises(ValueError):
+            cart.remove_item(info, {**BIG_MAC, "quantity": quantity})
+    assert info.items[0]["quantity"] == 1
+    assert info.total_price == 6900
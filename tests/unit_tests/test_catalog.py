@@ -0,0 +1,53 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from agent.catalog import CATALOG_FILE, DEFAULT_CATALOG_DIR, SALES_FILE, CatalogStore
+
+
+@pytest.fixture
+def catalog_dir(tmp_path):
+    for name in (CATALOG_FILE, SALES_FILE):
+        shutil.copy(os.path.join(DEFAULT_CATALOG_DIR, name), tmp_path / name)
+    return tmp_path
+
+
+def write_catalog(directory, data) -> None:
+    # Publish atomically, the way a deploy would.
+    tmp = directory / "catalog.json.tmp"
+    tmp.write_text(data if isinstance(data, str) else json.dumps(data))
+    os.replace(tmp, directory / CATALOG_FILE)
+
+
+def test_catalog_snapshot_contents(catalog_dir) -> None:
+    snapshot = CatalogStore(str(catalog_dir)).current()
+    assert snapshot.menus_by_id[7].name == "빅맥®"
+    assert snapshot.options_by_id[1].price_krw == 200
+    assert snapshot.sales_features["빅맥®"]["20대"] > 0
+    with pytest.raises(TypeError):
+        snapshot.menus_by_id[7] = None
+
+
+def test_catalog_hot_reload_keeps_pinned_snapshot(catalog_dir) -> None:
+    store = CatalogStore(str(catalog_dir), check_interval=0)
+    old = store.current()
+
+    data = json.loads((catalog_dir / CATALOG_FILE).read_text())
+    data["menus"][0]["price_krw"] += 100
+    write_catalog(catalog_dir, data)
+
+    new = store.current()
+    assert new.version != old.version
+    assert new.menus[0].price_krw == old.menus[0].price_krw + 100
+    # In-flight conversations still resolve the version they were pinned to.
+    assert store.get(old.version) is old
+    assert store.get(None) is new
+
+
+def test_catalog_keeps_snapshot_on_invalid_file(catalog_dir) -> None:
+    store = CatalogStore(str(catalog_dir), check_interval=0)
+    old = store.current()
+    write_catalog(catalog_dir, "{not json")
+    assert store.current() is old
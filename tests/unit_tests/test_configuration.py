@@ -3,3 +3,18 @@ from agent.configuration import Configuration
 
 def test_configuration_empty() -> None:
     Configuration.from_runnable_config({})
+
+
+def test_configuration_is_resolved_once_per_config() -> None:
+    config = {"configurable": {"user_id": "u-1", "fallback_models": "a/b, c/d"}}
+    first = Configuration.from_runnable_config(config)
+    assert Configuration.from_runnable_config(dict(config)) is first
+    assert first.user_id == "u-1"
+    assert first.model_candidates == [first.model, "a/b", "c/d"]
+
+
+def test_system_prompt_template_matches_str_format() -> None:
+    configuration = Configuration.from_runnable_config({})
+    assert configuration.system_prompt_template.format(
+        user_info="info", time="now"
+    ) == configuration.system_prompt.format(user_info="info", time="now")
@@ -0,0 +1,66 @@
+import dataclasses
+
+import pytest
+
+from agent import cart, pricing
+from agent.catalog import DEFAULT_CATALOG_DIR, CatalogStore, MenuOption
+from agent.state import PurchaseInformation
+
+
+@pytest.fixture(scope="module")
+def snapshot():
+    return CatalogStore(DEFAULT_CATALOG_DIR).current()
+
+
+def test_price_table_includes_options(snapshot) -> None:
+    table = pricing.price_table(snapshot)
+    assert table.unit_price(7) == 6900
+    assert table.unit_price(7, [1]) == 7100
+    assert pricing.price_table(snapshot) is table
+    with pytest.raises(ValueError):
+        table.unit_price(7, [999])
+
+
+def test_build_item_uses_catalog_prices(snapshot) -> None:
+    item = pricing.build_item(snapshot, 7, 2, [1, 1])
+    assert item["name"] == "빅맥®"
+    assert (item["price"], item["quantity"]) == (7100, 2)
+    assert item["options"] == [{"id": 1, "name": "피클", "price": 200}]
+    for args in [(999,), (7, 0), (7, 1, [999])]:
+        with pytest.raises(ValueError):
+            pricing.build_item(snapshot, *args)
+
+
+def test_reprice_after_catalog_change(snapshot) -> None:
+    info = PurchaseInformation()
+    cart.add_item(info, pricing.build_item(snapshot, 7))
+    cart.add_item(info, pricing.build_item(snapshot, 1, 2, [1]))
+    cart.add_item(info, {"id": 999, "name": "단종", "price": 1000, "quantity": 1})
+
+    menus = tuple(
+        dataclasses.replace(menu, price_krw=menu.price_krw + 100)
+        if menu.id == 7
+        else menu
+        for menu in snapshot.menus
+    )
+    updated = dataclasses.replace(snapshot, version="updated", menus=menus)
+
+    deltas = cart.reprice(info, updated)
+    assert [(delta["op"], delta["index"]) for delta in deltas] == [("update", 0)]
+    assert deltas[0]["item"]["price"] == 7000
+    assert info.total_price == 7000 + 2 * 8100 + 1000
+    assert cart.reprice(info, updated) == []
+
+
+def test_price_table_handles_many_options(snapshot) -> None:
+    options = tuple(
+        MenuOption(id=100 + i, name=f"옵션 {i}", price_krw=10) for i in range(16)
+    )
+    catalog = dataclasses.replace(snapshot, version="many-options", options=options)
+    table = pricing.price_table(catalog)
+    assert table.unit_price(7, [100, 115]) == 6920
+
+    info = PurchaseInformation()
+    cart.add_item(info, pricing.build_item(catalog, 7, 1, range(100, 116)))
+    assert info.items[0]["price"] == 6900 + 16 * 10
+    assert cart.reprice(info, catalog) == []
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from agent.profiling import profiled
+
+
+def burn() -> int:
+    return sum(i * i for i in range(2_000_000))
+
+
+@profiled("cart")
+def sync_node(state, config):
+    return burn()
+
+
+@profiled("agent")
+async def async_node(state, config):
+    # Work done in child tasks and on executor threads they start is attributed
+    # to the node; nothing runs on the event loop itself.
+    return await asyncio.create_task(asyncio.to_thread(burn))
+
+
+def test_profiled_sync_node_writes_collapsed_stacks(tmp_path) -> None:
+    config = {
+        "configurable": {
+            "thread_id": "t-1",
+            "profile_targets": "t-1",
+            "profile_dir": str(tmp_path),
+        }
+    }
+    sync_node({}, config=config)
+    lines = (tmp_path / "t-1.collapsed").read_text().splitlines()
+    assert lines
+    assert all(line.startswith("cart;") for line in lines)
+    assert any("burn" in line for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_profiled_async_node_by_user_id(tmp_path) -> None:
+    config = {
+        "configurable": {
+            "user_id": "u-1",
+            "profile_targets": "u-1",
+            "profile_dir": str(tmp_path),
+        }
+    }
+    await async_node({}, config=config)
+    lines = (tmp_path / "u-1.collapsed").read_text().splitlines()
+    assert any(line.startswith("agent;burn") for line in lines)
+
+
+def test_untargeted_run_is_not_profiled(tmp_path) -> None:
+    config = {"configurable": {"user_id": "u-2", "profile_dir": str(tmp_path)}}
+    sync_node({}, config=config)
+    assert not list(tmp_path.iterdir())
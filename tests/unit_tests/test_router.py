@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from agent.admission import AdmissionController
+from agent.router import ModelRouter
+
+
+def stub_models(delays: dict[str, float], failing: frozenset[str] = frozenset()):
+    def factory(name: str):
+        async def call(_input):
+            await asyncio.sleep(delays[name])
+            if name in failing:
+                raise RuntimeError(f"{name} is down")
+            return name
+
+        return RunnableLambda(call)
+
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_router_hedges_slow_primary() -> None:
+    router = ModelRouter(
+        stub_models({"slow/a": 1.0, "fast/b": 0.01}), default_hedge_delay=0.05
+    )
+    assert (
+        await router.ainvoke(["slow/a", "fast/b"], "hi", policy="priority") == "fast/b"
+    )
+    assert router.stats["fast/b"].calls == 1
+
+
+@pytest.mark.asyncio
+async def test_router_falls_back_on_error() -> None:
+    router = ModelRouter(
+        stub_models({"a/a": 0.0, "b/b": 0.0}, failing=frozenset({"a/a"})),
+        default_hedge_delay=10,
+    )
+    assert await router.ainvoke(["a/a", "b/b"], "hi") == "b/b"
+    assert router.stats["a/a"].error_rate > 0
+    # The failing candidate is now ranked behind the healthy one.
+    assert router.rank(["a/a", "b/b"]) == ["b/b", "a/a"]
+
+
+@pytest.mark.asyncio
+async def test_router_raises_when_all_candidates_fail() -> None:
+    router = ModelRouter(
+        stub_models({"a/a": 0.0}, failing=frozenset({"a/a"})), default_hedge_delay=10
+    )
+    with pytest.raises(RuntimeError):
+        await router.ainvoke(["a/a"], "hi")
+
+
+def test_router_cost_policy() -> None:
+    router = ModelRouter(stub_models({}), costs={"a/a": 3.0, "b/b": 0.1})
+    assert router.rank(["a/a", "b/b"], "cost") == ["b/b", "a/a"]
+
+
+@pytest.mark.asyncio
+async def test_router_demotes_primary_that_slows_down() -> None:
+    delays = {"a/a": 0.01, "b/b": 0.02}
+    router = ModelRouter(stub_models(delays), default_hedge_delay=0.05)
+    for _ in range(6):
+        assert await router.ainvoke(["a/a", "b/b"], "hi") == "a/a"
+    assert router.rank(["a/a", "b/b"]) == ["a/a", "b/b"]
+
+    # The primary now only answers after the hedge, so its calls are abandoned.
+    delays["a/a"] = 2.0
+    for _ in range(10):
+        assert await router.ainvoke(["a/a", "b/b"], "hi") == "b/b"
+        if router.rank(["a/a", "b/b"])[0] == "b/b":
+            break
+    assert router.stats["a/a"].calls > 6
+    assert router.rank(["a/a", "b/b"]) == ["b/b", "a/a"]
+    assert await router.ainvoke(["a/a", "b/b"], "hi") == "b/b"
+
+
+class RateLimitError(Exception):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_router_admits_every_provider_request() -> None:
+    admission = AdmissionController(initial_limit=4)
+    in_flight = []
+
+    def factory(name: str):
+        async def call(_input):
+            in_flight.append(admission.in_flight)
+            await asyncio.sleep(1.0 if name == "slow/a" else 0.01)
+            return name
+
+        return RunnableLambda(call)
+
+    router = ModelRouter(factory, default_hedge_delay=0.05, admission=admission)
+    assert await router.ainvoke(["slow/a", "fast/b"], "hi", policy="priority") == (
+        "fast/b"
+    )
+    # The hedge held its own slot while the primary was still running.
+    assert in_flight == [1, 2]
+    # The cancelled primary gives its slot back once it unwinds.
+    await asyncio.sleep(0.01)
+    assert admission.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_router_reports_rate_limits_when_fallback_succeeds() -> None:
+    admission = AdmissionController(initial_limit=8)
+
+    def factory(name: str):
+        async def call(_input):
+            if name == "a/a":
+                raise RateLimitError("429")
+            return name
+
+        return RunnableLambda(call)
+
+    router = ModelRouter(factory, admission=admission)
+    assert await router.ainvoke(["a/a", "b/b"], "hi", policy="priority") == "b/b"
+    assert admission.metrics.rate_limited == 1
+    assert admission.limit < 8
+
+
+@pytest.mark.asyncio
+async def test_router_hedge_deadline_starts_at_admission() -> None:
+    admission = AdmissionController(initial_limit=1)
+    called = []
+
+    def factory(name: str):
+        async def call(_input):
+            called.append(name)
+            await asyncio.sleep(0.3)
+            return name
+
+        return RunnableLambda(call)
+
+    router = ModelRouter(factory, default_hedge_delay=0.5, admission=admission)
+
+    async def hold_slot():
+        async with admission.admit():
+            await asyncio.sleep(0.9)
+
+    holder = asyncio.ensure_future(hold_slot())
+    await asyncio.sleep(0)
+    assert await router.ainvoke(["a/a", "b/b"], "hi", policy="priority") == "a/a"
+    await holder
+    assert called == ["a/a"]
+    # Queueing does not count against the provider.
+    assert router.stats["a/a"].ewma_latency < 0.5
+
+
+@pytest.mark.asyncio
+async def test_router_queued_hedge_never_reaches_provider() -> None:
+    admission = AdmissionController(initial_limit=1)
+    called = []
+
+    def factory(name: str):
+        async def call(_input):
+            called.append(name)
+            await asyncio.sleep(0.3)
+            return name
+
+        return RunnableLambda(call)
+
+    router = ModelRouter(factory, default_hedge_delay=0.05, admission=admission)
+    # The hedge is queued behind the primary, which releases its slot on success.
+    assert await router.ainvoke(["a/a", "b/b"], "hi", policy="priority") == "a/a"
+    await asyncio.sleep(0.05)
+    assert called == ["a/a"]
+    assert admission.in_flight == 0
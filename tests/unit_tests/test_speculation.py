@@ -0,0 +1,52 @@
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent import speculation
+from agent.state import State
+
+
+def test_classify_predicts_argument_free_tools() -> None:
+    assert speculation.classify(HumanMessage("버거 추천해줘")) == ["suggest_burgers"]
+    assert speculation.classify(HumanMessage("What's in my cart?")) == [
+        "get_current_purchase_information"
+    ]
+    assert speculation.classify(HumanMessage("안녕하세요")) == []
+    assert speculation.classify(AIMessage("recommend")) == []
+
+
+@pytest.mark.asyncio
+async def test_resolve_answers_prefetched_tool_calls() -> None:
+    state = State(messages=[HumanMessage("recommend me a burger")])
+    tasks = speculation.prefetch(state, {})
+    msg = AIMessage(
+        "", tool_calls=[{"name": "suggest_burgers", "args": {}, "id": "call-1"}]
+    )
+    hits = speculation.stats.hits
+
+    tool_messages = await speculation.resolve(msg, tasks)
+
+    assert tool_messages is not None
+    assert tool_messages[0].tool_call_id == "call-1"
+    assert json.loads(tool_messages[0].content)["burgerItems"]
+    assert speculation.stats.hits == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_resolve_falls_back_when_model_needs_other_tools() -> None:
+    state = State(messages=[HumanMessage("recommend me a burger")])
+    tasks = speculation.prefetch(state, {})
+    msg = AIMessage(
+        "",
+        tool_calls=[
+            {"name": "suggest_burgers", "args": {}, "id": "call-1"},
+            {"name": "purchase_burger_items", "args": {}, "id": "call-2"},
+        ],
+    )
+    wasted, misses = speculation.stats.wasted, speculation.stats.misses
+
+    assert await speculation.resolve(msg, tasks) is None
+    assert speculation.stats.wasted == wasted + 1
+    # It was predicted, so it is not a miss as well.
+    assert speculation.stats.misses == misses